@@ -1,12 +1,34 @@
+import asyncio
 import csv
+import hashlib
 import os
+import signal
+import sqlite3
+import threading
 import time
-from typing import List, Dict, Any
+import uuid
+from itertools import islice
+from typing import List, Dict, Any, Tuple, Callable, Awaitable, Iterable, Iterator
+import numpy as np
 import pandas as pd
-from langchain_postgres import PGVector
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import httpx
+import psycopg
+from google.genai.errors import ClientError, ServerError
+from pgvector.psycopg import register_vector_async
+from pgvector.sqlalchemy import HALFVEC
+from sqlalchemy import Integer, Text, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import DeclarativeBase, mapped_column
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 import json
+from array import array
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
 from tqdm import tqdm
 import logging
 from dotenv import load_dotenv
@@ -18,11 +40,175 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fixed fragments of a document's page content, around the Arabic and English text
+_P0 = "الحديث باللغة العربية:\n"
+_P1 = "\n\nhadith in english:\n"
+# Bytes of CSV parsed per chunk (roughly 7000 hadiths)
+CSV_BLOCK_SIZE = 8 << 20
+# Explicit types so a later block can't contradict what was inferred from the first
+CSV_COLUMN_TYPES = {
+    'source': pa.string(),
+    'chapter_no': pa.int64(),
+    'hadith_no': pa.string(),
+    'chapter': pa.string(),
+    'chain_indx': pa.string(),
+    'text_ar': pa.string(),
+    'text_en': pa.string(),
+}
+# Resume progress, written periodically during a run and whenever it stops early
+PROGRESS_FILE = "insertion_progress.json"
+# Seconds between progress file writes; bounds the rows a hard kill re-inserts on resume
+PROGRESS_FLUSH_INTERVAL = 30
+# Embedded batches waiting for a database consumer; bounds peak memory
+QUEUE_MAXSIZE = 4
+# Gemini accepts at most this many texts per embedding request
+EMBED_CHUNK_SIZE = 100
+# Dimension requested from Gemini and of the embedding column (gemini-embedding-001 returns 3072 by default)
+EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', '3072'))
+# Older SQLite builds allow at most this many ? placeholders per statement
+SQLITE_MAX_VARIABLES = 999
+# HNSW index on the embedding column, dropped during bulk loads and rebuilt afterwards
+VECTOR_INDEX_NAME = "hadith_embeddings_embedding_idx"
+# pgvector cannot build an HNSW index on halfvec columns wider than this
+HNSW_MAX_DIMENSIONS = 4000
+
+# Errors worth retrying; anything else is a bug and fails the batch immediately.
+# google-genai talks to Gemini over httpx, so network timeouts and dropped connections surface as httpx errors
+TRANSIENT_ERRORS = (psycopg.OperationalError, OperationalError, ServerError, TimeoutError,
+                    httpx.TimeoutException, httpx.TransportError)
+
+def _is_transient(exc: BaseException) -> bool:
+    """Whether exc, or the error it wraps, is worth retrying"""
+    # langchain_google_genai re-raises API errors as GoogleGenerativeAIError
+    for error in (exc, exc.__cause__):
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        # 429 RESOURCE_EXHAUSTED: rate limited, the request itself is fine
+        if isinstance(error, ClientError) and error.code == 429:
+            return True
+    return False
+
+_rng = np.random.default_rng()
+
+def _uuid7_batch(n: int) -> List[uuid.UUID]:
+    """
+    Generate n RFC 9562 version 7 UUIDs from a single block of random bytes
+    
+    The leading 48 bits are the current Unix time in milliseconds, so ids from one
+    ingest sort together and land near each other in the primary key index.
+    """
+    raw = np.frombuffer(_rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    timestamp_ms = time.time_ns() // 1_000_000
+    raw[:, :6] = np.frombuffer(timestamp_ms.to_bytes(6, 'big'), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x70  # version 7
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return [uuid.UUID(bytes=row.tobytes()) for row in raw]
+
+class Base(DeclarativeBase):
+    pass
+
+class HadithEmbedding(Base):
+    """An embedded hadith, with its metadata stored as plain columns rather than JSONB"""
+    __tablename__ = "hadith_embeddings"
+    
+    id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # FP16 halves the bytes written to heap and WAL per row at roughly the same recall
+    embedding = mapped_column(HALFVEC(EMBEDDING_DIM), nullable=False)
+    text = mapped_column(Text, nullable=False)
+    source = mapped_column(Text, index=True)
+    # Some hadith numbers carry a letter suffix (e.g. "815b"), so this is not an integer
+    hadith_number = mapped_column(Text)
+    chapter_number = mapped_column(Integer)
+    chapter = mapped_column(Text)
+    chain_index = mapped_column(Text)
+
+# Column order used by the COPY insert path
+EMBEDDING_COLUMNS = ("id", "embedding", "text", "source", "hadith_number", "chapter_number", "chapter", "chain_index")
+# PostgreSQL types of EMBEDDING_COLUMNS, which binary COPY needs to pick each column's dumper
+EMBEDDING_COLUMN_TYPES = ("uuid", "halfvec", "text", "text", "text", "int4", "text", "text")
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches document vectors in SQLite, keyed by a hash of the text
+    
+    Re-running an interrupted ingest then only pays for texts that were never embedded.
+    Vectors are stored as float32 blobs. Query embeddings are passed straight through.
+    """
+    
+    def __init__(self, base: Embeddings, path: str = "embed_cache.sqlite", namespace: str = ""):
+        """
+        Args:
+            base: Embeddings used for cache misses
+            path: Path of the SQLite cache file
+            namespace: Hashed into every key, e.g. model name and dimension, so vectors
+                from a different model or width are never served
+        """
+        self.base = base
+        self.path = path
+        self.namespace = namespace
+        # The async methods use the connection from worker threads, one at a time under _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # No fsync per commit; a crash can only lose the newest entries, which get re-embedded
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+    
+    def _hash(self, text: str) -> str:
+        h = hashlib.blake2b(self.namespace.encode(), digest_size=16)
+        h.update(b"\0")
+        h.update(text.encode())
+        return h.hexdigest()
+    
+    def _lookup(self, texts: List[str]) -> Tuple[List[str], List[Any], List[int]]:
+        """Return the text hashes, cached vectors (None on a miss) and indices of the misses"""
+        hashes = [self._hash(t) for t in texts]
+        cached = {}
+        with self._lock:
+            for i in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                chunk = hashes[i:i + SQLITE_MAX_VARIABLES]
+                cached.update(self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+        vectors = [array('f', cached[h]).tolist() if h in cached else None for h in hashes]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        return hashes, vectors, missing
+    
+    def _store(self, hashes: List[str], vectors: List[Any], missing: List[int], new_vectors: List[List[float]]):
+        """Fill the misses with freshly embedded vectors and write them to the cache"""
+        for i, vector in zip(missing, new_vectors):
+            vectors[i] = vector
+        rows = [(hashes[i], array('f', vectors[i]).tobytes()) for i in missing]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, vectors, missing = self._lookup(texts)
+        if missing:
+            new_vectors = self.base.embed_documents([texts[i] for i in missing])
+            self._store(hashes, vectors, missing, new_vectors)
+        return vectors
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # SQLite calls block, so run them in a thread rather than stalling the event loop
+        hashes, vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            new_vectors = await self.base.aembed_documents([texts[i] for i in missing])
+            await asyncio.to_thread(self._store, hashes, vectors, missing, new_vectors)
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.base.aembed_query(text)
+
 class HadithPGVectorInserter:
     def __init__(self, 
                  postgres_url: str = None,
                  google_api_key: str = None,
-                 collection_name: str = None,
                  max_retries: int = None):
         """
         Initialize the Hadith PostgreSQL pgvector inserter
@@ -30,14 +216,19 @@ class HadithPGVectorInserter:
         Args:
             postgres_url: PostgreSQL connection string (defaults to POSTGRES_URL env var)
             google_api_key: Google API key for Gemini embeddings (defaults to GOOGLE_API_KEY env var)
-            collection_name: Name of the pgvector collection (defaults to COLLECTION_NAME env var)
             max_retries: Maximum number of retries for failed operations (defaults to MAX_RETRIES env var)
         """
         # Load configuration from environment variables with fallbacks
         self.postgres_url = postgres_url or os.getenv('POSTGRES_URL')
         self.google_api_key = google_api_key or os.getenv('GOOGLE_API_KEY')
-        self.collection_name = collection_name or os.getenv('COLLECTION_NAME', 'rag_ahadees')
         self.max_retries = max_retries or int(os.getenv('MAX_RETRIES', '3'))
+        self.embed_concurrency = int(os.getenv('EMBED_CONCURRENCY', '8'))
+        self.insert_concurrency = int(os.getenv('INSERT_CONCURRENCY', '4'))
+        self.embedding_dimension = EMBEDDING_DIM
+        self.pool_size = int(os.getenv('PG_POOL_SIZE', str(self.insert_concurrency)))
+        self.embed_cache_path = os.getenv('EMBED_CACHE_PATH', 'embed_cache.sqlite')
+        # An unlogged table is emptied if PostgreSQL crashes; fine for data rebuildable from the CSV
+        self.allow_unlogged = os.getenv('ALLOW_UNLOGGED', 'false').lower() == 'true'
         
         # Validate required configuration
         if not self.postgres_url:
@@ -46,32 +237,59 @@ class HadithPGVectorInserter:
             raise ValueError("GOOGLE_API_KEY is required")
         
         logger.info(f"Initializing with PostgreSQL URL: {self.postgres_url}")
-        logger.info(f"Collection: {self.collection_name}")
+        logger.info(f"Table: {HadithEmbedding.__tablename__}")
         logger.info(f"Max retries: {self.max_retries}")
+        logger.info(f"Embedding concurrency: {self.embed_concurrency}")
+        logger.info(f"Insert concurrency: {self.insert_concurrency}")
+        logger.info(f"Connection pool size: {self.pool_size}")
+        logger.info(f"Embedding cache: {self.embed_cache_path}")
+        logger.info(f"Unlogged bulk load: {self.allow_unlogged}")
         
         os.environ["GOOGLE_API_KEY"] = self.google_api_key
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001",
-            google_api_key=self.google_api_key
+        # Cache vectors on disk so a resumed run doesn't pay to re-embed documents
+        embedding_model = "models/gemini-embedding-001"
+        self.embeddings = CachedEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model=embedding_model,
+                google_api_key=self.google_api_key,
+                # Ask Gemini for vectors that fit the embedding column
+                output_dimensionality=self.embedding_dimension
+            ),
+            path=self.embed_cache_path,
+            namespace=f"{embedding_model}:{self.embedding_dimension}"
         )
         
-        # Initialize PostgreSQL pgvector store
-        self.vector_store = PGVector(
-            connection=self.postgres_url,
-            embeddings=self.embeddings,
-            collection_name=self.collection_name,
-            use_jsonb=True
+        # Size the pool to the insert concurrency so tasks don't queue on connection checkout
+        self.engine = create_async_engine(
+            self.postgres_url,
+            pool_size=self.pool_size,
+            max_overflow=8,
+            pool_pre_ping=True,
+            pool_recycle=1800
         )
         
+        # Running totals across all insert_chunks_batch calls, written to the progress file
+        self.successful_batches = 0
+        self.failed_batches = 0
+        # Latest progress, kept in memory and written out by _flush_progress
+        self._progress = None
+        self._last_flush = time.monotonic()
+        
         # Test connection before proceeding
         self._test_connection()
+        self._create_table_if_not_exists()
+        # Registered only now, as it needs the vector extension that table setup installs
+        event.listen(self.engine.sync_engine, "connect", self._register_vector_types)
+    
+    @staticmethod
+    def _register_vector_types(dbapi_connection, connection_record):
+        """Register pgvector's psycopg adapters (halfvec included) on each new pooled connection"""
+        dbapi_connection.run_async(register_vector_async)
     
     def _test_connection(self):
         """Test the connection to PostgreSQL"""
         try:
             logger.info("Testing PostgreSQL connection...")
-            # Test by trying to get collection info
-            # PGVector will create the collection if it doesn't exist
             logger.info("✅ Successfully connected to PostgreSQL with pgvector")
         except Exception as e:
             logger.error(f"❌ Failed to connect to PostgreSQL: {e}")
@@ -84,167 +302,398 @@ class HadithPGVectorInserter:
     def _create_table_if_not_exists(self):
         """Create the table if it doesn't exist"""
         try:
-            # PGVector will automatically create the table when needed
-            logger.info(f"Table for collection '{self.collection_name}' is ready")
+            self._run(self._acreate_table())
+            logger.info(f"Table '{HadithEmbedding.__tablename__}' is ready")
         except Exception as e:
             logger.error(f"Error preparing table: {e}")
             raise
-    def read_csv_file(self, csv_file_path: str) -> pd.DataFrame:
+    
+    async def _acreate_table(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.run_sync(Base.metadata.create_all)
+    
+    def read_csv_chunks(self, csv_file_path: str) -> Iterator[pd.DataFrame]:
         """
-        Read the CSV file containing hadith data
+        Stream the CSV file containing hadith data in chunks using pyarrow's CSV reader
         
         Args:
             csv_file_path: Path to the CSV file
             
-        Returns:
-            DataFrame containing the hadith data
+        Yields:
+            DataFrame for each block of roughly CSV_BLOCK_SIZE bytes
         """
-        try:
-            df = pd.read_csv(csv_file_path, encoding='utf-8')
-            logger.info(f"Successfully loaded {len(df)} rows from {csv_file_path}")
-            return df
-        except Exception as e:
-            logger.error(f"Error reading CSV file: {e}")
-            raise
+        reader = pacsv.open_csv(
+            csv_file_path,
+            read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+            # Some hadith texts contain line breaks inside quoted fields
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES, strings_can_be_null=True)
+        )
+        for record_batch in reader:
+            yield pa.Table.from_batches([record_batch]).to_pandas(self_destruct=True)
     
-    def create_document_from_row(self, row: pd.Series) -> Document:
+    def doc_stream(self, csv_file_path: str, skip_rows: int = 0) -> Iterator[Document]:
         """
-        Create a LangChain Document from a CSV row
+        Yield Documents one at a time from the CSV, converting one chunk of rows at a time
         
         Args:
-            row: Pandas Series representing a row from the CSV
+            csv_file_path: Path to the CSV file
+            skip_rows: Number of leading rows to skip (already inserted by a previous run)
+        """
+        row_offset = 0
+        for chunk_df in self.read_csv_chunks(csv_file_path):
+            chunk_start = row_offset
+            row_offset += len(chunk_df)
+            if row_offset <= skip_rows:
+                continue
+            
+            # Skip rows of a partially inserted chunk
+            chunk_df = chunk_df.iloc[max(skip_rows - chunk_start, 0):]
+            yield from self.create_documents_from_dataframe(chunk_df)
+        
+        logger.info(f"Read {row_offset} rows from {csv_file_path}")
+    
+    def create_documents_from_dataframe(self, df: pd.DataFrame) -> List[Document]:
+        """
+        Create LangChain Documents from a whole DataFrame using vectorized column operations
+        
+        Args:
+            df: DataFrame containing the hadith data
             
         Returns:
-            LangChain Document object
+            List of LangChain Document objects, one per row
         """
-        # Construct content from Arabic and English text
-        text_ar = row.get('text_ar', '')
-        text_en = row.get('text_en', '')
-        
-        content = f"الحديث باللغة العربية:\n{text_ar}\n\nhadith in english:\n{text_en}"        
-        # Create metadata dictionary
-        metadata = {
-            "source": row.get('source', 'Unknown'),
-            "hadith_number": row.get('hadith_no', 0) if pd.notna(row.get('hadith_no')) else 0,
-            "chapter_number": row.get('chapter_no', 0) if pd.notna(row.get('chapter_no')) else 0,
-            "chapter": row.get('chapter', ''),
-            "chain_index": row.get('chain_indx', ''),
-        }
+        df = df.fillna({
+            'hadith_no': 0,
+            'chapter_no': 0,
+            'chapter': '',
+            'chain_indx': '',
+            'source': 'Unknown',
+            'text_ar': '',
+            'text_en': '',
+        })
+        
+        # The CSV pads sources and hadith numbers with spaces (' Sahih Bukhari ', ' 1 ')
+        for column in ('source', 'hadith_no', 'chapter', 'chain_indx'):
+            df[column] = df[column].astype(str).str.strip()
+        
+        # Build page content column-wise instead of formatting one row at a time
+        contents = (
+            _P0 + df['text_ar'].astype(str)
+            + _P1 + df['text_en'].astype(str)
+        ).tolist()
+        
+        metadatas = df.rename(columns={
+            'hadith_no': 'hadith_number',
+            'chapter_no': 'chapter_number',
+            'chain_indx': 'chain_index',
+        })[['source', 'hadith_number', 'chapter_number', 'chapter', 'chain_index']].to_dict(orient='records')
         
-        return Document(page_content=content, metadata=metadata)
+        return [Document(page_content=content, metadata=metadata)
+                for content, metadata in zip(contents, metadatas)]
     
-    def insert_chunks_batch(self, documents: List[Document], batch_size: int = 25, resume_from: int = 0):
+    def insert_chunks_batch(self, documents: Iterable[Document], batch_size: int = 500, row_offset: int = 0):
         """
         Insert documents in batches to PostgreSQL with retry mechanism and resume capability
         
+        Documents are consumed lazily, so a generator such as doc_stream() is never fully
+        held in memory. Batches are embedded concurrently, up to EMBED_CONCURRENCY at a time,
+        while INSERT_CONCURRENCY consumers write earlier batches to the database.
+        
         Args:
-            documents: List of LangChain Document objects
+            documents: Iterable of LangChain Document objects
             batch_size: Number of documents to insert in each batch
-            resume_from: Resume from this batch number (0-indexed)
+            row_offset: CSV row index of the first document, used for resume progress
         """
-        total_docs = len(documents)
-        total_batches = (total_docs + batch_size - 1) // batch_size
-        logger.info(f"Starting to insert {total_docs} documents in batches of {batch_size} (total batches: {total_batches})")
+        logger.info(f"Starting to insert documents from row {row_offset} in batches of {batch_size}")
+        
+        self._run(self._ainsert_batches(documents, batch_size, row_offset))
         
-        if resume_from > 0:
-            logger.info(f"Resuming from batch {resume_from + 1}")
+        logger.info(f"Batch insertion complete. Successful: {self.successful_batches}, Failed: {self.failed_batches}")
+    
+    def _run(self, coro):
+        """Run a coroutine on a fresh event loop, releasing pooled connections when it finishes"""
+        async def runner():
+            try:
+                return await coro
+            finally:
+                # Pooled connections are bound to the loop that created them
+                await self.engine.dispose()
         
-        successful_batches = 0
-        failed_batches = 0
+        return asyncio.run(runner())
+    
+    async def _ainsert_batches(self, documents: Iterable[Document], batch_size: int, row_offset: int):
+        """
+        Embed and insert documents as a bounded producer-consumer pipeline
         
-        for i in tqdm(range(resume_from * batch_size, total_docs, batch_size), desc="Inserting batches"):
-            batch = documents[i:i + batch_size]
-            batch_num = i // batch_size + 1
+        A producer embeds batches concurrently (bounded by a semaphore) and queues the
+        results; consumers drain the queue into COPY, so the embedding API and the
+        database are kept busy at the same time. The queue holds at most QUEUE_MAXSIZE
+        embedded batches, which caps memory however large the input is.
+        
+        Args:
+            documents: Iterable of LangChain Document objects
+            batch_size: Number of documents per batch
+            row_offset: CSV row index of the first document
+        """
+        queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+        state = {"next_row": row_offset, "finished": {}}
+        
+        with tqdm(desc="Inserting batches", unit="batch") as progress_bar:
+            await asyncio.gather(
+                self._producer(documents, batch_size, row_offset, queue),
+                *(self._consumer(queue, state, progress_bar) for _ in range(self.insert_concurrency)),
+            )
+    
+    async def _producer(self, documents: Iterable[Document], batch_size: int, row_offset: int, queue: asyncio.Queue):
+        """Embed batches concurrently and queue (batch number, first row, documents, vectors) for insertion"""
+        sem = asyncio.Semaphore(self.embed_concurrency)
+        
+        async def embed(batch_num: int, start_row: int, batch: List[Document]):
+            try:
+                try:
+                    vectors = await self._aretry(lambda: self._aembed_documents(batch), batch_num)
+                except Exception:
+                    vectors = None
+                await queue.put((batch_num, start_row, batch, vectors))
+            finally:
+                # Held until the batch is queued, so waiting batches also count against the limit
+                sem.release()
+        
+        tasks = []
+        iterator = iter(documents)
+        batch_num = 0
+        start_row = row_offset
+        while True:
+            await sem.acquire()
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                sem.release()
+                break
+            batch_num += 1
+            tasks.append(asyncio.create_task(embed(batch_num, start_row, batch)))
+            start_row += len(batch)
+        await asyncio.gather(*tasks)
+        
+        # Tell each consumer there is nothing left to insert
+        for _ in range(self.insert_concurrency):
+            await queue.put(None)
+    
+    async def _consumer(self, queue: asyncio.Queue, state: Dict[str, Any], progress_bar: tqdm):
+        """Drain embedded batches from the queue into PostgreSQL"""
+        finished = state["finished"]
+        
+        while (item := await queue.get()) is not None:
+            batch_num, start_row, batch, vectors = item
             
-            # Try to insert the batch with retries
-            success = self._insert_batch_with_retry(batch, batch_num)
+            success = False
+            if vectors is not None:
+                try:
+                    await self._aretry(lambda: self._acopy_rows(batch, vectors), batch_num)
+                    logger.info(f"Successfully inserted batch {batch_num}")
+                    success = True
+                except Exception:
+                    pass
+            progress_bar.update(1)
+            
+            # Batches finish out of order; only advance past a contiguous run of finished rows
+            finished[start_row] = start_row + len(batch)
+            while state["next_row"] in finished:
+                state["next_row"] = finished.pop(state["next_row"])
             
             if success:
-                successful_batches += 1
-                # Save progress every 10 successful batches
-                if successful_batches % 10 == 0:
-                    self._save_progress(batch_num, successful_batches, failed_batches)
+                self.successful_batches += 1
             else:
-                failed_batches += 1
-                
-            # Add a small delay between batches to prevent overwhelming the database
-            time.sleep(0.5)
+                self.failed_batches += 1
+            self._save_progress(state["next_row"], self.successful_batches, self.failed_batches)
+    
+    async def _aretry(self, operation: Callable[[], Awaitable[Any]], batch_num: int) -> Any:
+        """Await operation(), retrying transient errors with jittered exponential backoff"""
+        def log_retry(retry_state):
+            logger.warning(f"Attempt {retry_state.attempt_number} failed for batch {batch_num}: "
+                           f"{retry_state.outcome.exception()}. Retrying in {retry_state.next_action.sleep:.1f} seconds...")
         
-        logger.info(f"Batch insertion complete. Successful: {successful_batches}, Failed: {failed_batches}")
+        try:
+            async for attempt in AsyncRetrying(
+                wait=wait_random_exponential(multiplier=1, max=30),
+                stop=stop_after_attempt(self.max_retries),
+                retry=retry_if_exception(_is_transient),
+                before_sleep=log_retry,
+                reraise=True
+            ):
+                with attempt:
+                    return await operation()
+        except Exception as e:
+            logger.error(f"Failed to process batch {batch_num}: {e}")
+            raise
     
-    def _insert_batch_with_retry(self, batch: List[Document], batch_num: int) -> bool:
-        """Insert a batch with retry mechanism using pgvector"""
-        for attempt in range(self.max_retries):
-            try:
-                # Use pgvector's add_documents method
-                self.vector_store.add_documents(batch)
-                logger.info(f"Successfully inserted batch {batch_num}")
-                return True
-            except Exception as e:
-                logger.warning(f"Attempt {attempt + 1} failed for batch {batch_num}: {e}")
-                if attempt < self.max_retries - 1:
-                    # Wait before retrying (exponential backoff)
-                    wait_time = (2 ** attempt) * 2
-                    logger.info(f"Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed to insert batch {batch_num} after {self.max_retries} attempts: {e}")
-                    return False
-        return False
-    
-    def _save_progress(self, current_batch: int, successful: int, failed: int):
-        """Save progress to a file for potential resume"""
-        progress_data = {
-            "current_batch": current_batch,
+    async def _aembed_documents(self, batch: List[Document]) -> np.ndarray:
+        """
+        Embed documents in chunks of EMBED_CHUNK_SIZE, the most Gemini accepts per request
+        
+        Returns:
+            float32 array of shape (len(batch), embedding dimension); 4 bytes per element
+            instead of a Python float object per element in nested lists
+        """
+        vectors = np.empty((len(batch), self.embedding_dimension), dtype=np.float32)
+        for i in range(0, len(batch), EMBED_CHUNK_SIZE):
+            chunk = batch[i:i + EMBED_CHUNK_SIZE]
+            vectors[i:i + len(chunk)] = await self.embeddings.aembed_documents([doc.page_content for doc in chunk])
+        return vectors
+    
+    async def _acopy_rows(self, batch: List[Document], vectors: np.ndarray):
+        """
+        Bulk-load embedded documents into the hadith_embeddings table with COPY
+        
+        Binary COPY sends each vector as 2 bytes per FP16 element, rather than a decimal
+        string the server has to parse.
+        
+        Args:
+            batch: List of LangChain Document objects
+            vectors: float32 array with one embedding row per document in batch
+        """
+        # The transaction is committed (or rolled back) by engine.begin()
+        async with self.engine.begin() as conn:
+            raw_connection = await conn.get_raw_connection()
+            async with raw_connection.driver_connection.cursor() as cur:
+                async with cur.copy(
+                    f"COPY {HadithEmbedding.__tablename__} ({', '.join(EMBEDDING_COLUMNS)}) FROM STDIN WITH (FORMAT BINARY)"
+                ) as copy:
+                    copy.set_types(EMBEDDING_COLUMN_TYPES)
+                    for doc, vector, row_id in zip(batch, vectors, _uuid7_batch(len(batch))):
+                        metadata = doc.metadata
+                        await copy.write_row((
+                            row_id,
+                            vector,
+                            doc.page_content,
+                            metadata["source"],
+                            str(metadata["hadith_number"]),
+                            int(metadata["chapter_number"]),
+                            metadata["chapter"],
+                            metadata["chain_index"],
+                        ))
+    
+    def _drop_vector_index(self):
+        """Drop the HNSW index so bulk inserts don't pay index maintenance per row"""
+        self._run(self._adrop_vector_index())
+    
+    async def _adrop_vector_index(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+        logger.info(f"Dropped vector index {VECTOR_INDEX_NAME} for bulk load")
+    
+    def _create_vector_index(self):
+        """Rebuild the HNSW index once all documents are loaded"""
+        if self.embedding_dimension > HNSW_MAX_DIMENSIONS:
+            logger.warning(f"Skipping HNSW index: {self.embedding_dimension} dimensions exceeds "
+                           f"pgvector's limit of {HNSW_MAX_DIMENSIONS} for halfvec columns")
+            return
+        self._run(self._acreate_vector_index())
+    
+    async def _acreate_vector_index(self):
+        logger.info(f"Building vector index {VECTOR_INDEX_NAME}...")
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SET LOCAL maintenance_work_mem = '2GB'"))
+            await conn.execute(text("SET LOCAL max_parallel_maintenance_workers = 4"))
+            await conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAME} ON {HadithEmbedding.__tablename__} "
+                "USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64)"
+            ))
+        logger.info(f"Vector index {VECTOR_INDEX_NAME} created")
+    
+    def _set_table_logged(self, logged: bool):
+        """Switch the table between LOGGED and UNLOGGED (skipping WAL) for the duration of a bulk load"""
+        self._run(self._aset_table_logged(logged))
+    
+    async def _aset_table_logged(self, logged: bool):
+        mode = "LOGGED" if logged else "UNLOGGED"
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f"ALTER TABLE {HadithEmbedding.__tablename__} SET {mode}"))
+        logger.info(f"Table {HadithEmbedding.__tablename__} set {mode}")
+    
+    def _count_rows(self) -> int:
+        """Count the rows currently in the table"""
+        return self._run(self._acount_rows())
+    
+    async def _acount_rows(self) -> int:
+        async with self.engine.connect() as conn:
+            return (await conn.execute(text(f"SELECT count(*) FROM {HadithEmbedding.__tablename__}"))).scalar()
+    
+    def _save_progress(self, current_row: int, successful: int, failed: int):
+        """Record progress in memory, writing it to disk at most every PROGRESS_FLUSH_INTERVAL seconds"""
+        self._progress = {
+            "current_row": current_row,
             "successful_batches": successful,
             "failed_batches": failed,
             "timestamp": time.time()
         }
+        if time.monotonic() - self._last_flush >= PROGRESS_FLUSH_INTERVAL:
+            self._flush_progress()
+    
+    def _flush_progress(self):
+        """Write the recorded progress to the progress file for potential resume"""
+        if self._progress is None:
+            return
         
+        self._last_flush = time.monotonic()
         try:
-            with open("insertion_progress.json", "w") as f:
-                json.dump(progress_data, f)
-            logger.info(f"Progress saved: Batch {current_batch}, Successful: {successful}, Failed: {failed}")
+            # Write a temporary file and swap it in so the progress file is never half-written
+            tmp_path = PROGRESS_FILE + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._progress, f)
+            os.replace(tmp_path, PROGRESS_FILE)
+            logger.info(f"Progress saved: Row {self._progress['current_row']}, Successful: {self._progress['successful_batches']}, Failed: {self._progress['failed_batches']}")
         except Exception as e:
             logger.warning(f"Could not save progress: {e}")
     
+    def _handle_sigterm(self, signum, frame):
+        """Turn SIGTERM into SystemExit so the run unwinds and flushes its progress"""
+        logger.warning("Received SIGTERM, stopping")
+        raise SystemExit(128 + signum)
+    
     def _load_progress(self) -> Dict[str, Any]:
         """Load progress from file if it exists"""
         try:
-            if os.path.exists("insertion_progress.json"):
-                with open("insertion_progress.json", "r") as f:
+            if os.path.exists(PROGRESS_FILE):
+                with open(PROGRESS_FILE, "r") as f:
                     progress = json.load(f)
-                logger.info(f"Loaded progress: Batch {progress['current_batch']}, Successful: {progress['successful_batches']}, Failed: {progress['failed_batches']}")
+                logger.info(f"Loaded progress: Row {progress['current_row']}, Successful: {progress['successful_batches']}, Failed: {progress['failed_batches']}")
                 return progress
         except Exception as e:
             logger.warning(f"Could not load progress: {e}")
         
-        return {"current_batch": 0, "successful_batches": 0, "failed_batches": 0}
+        return {"current_row": 0, "successful_batches": 0, "failed_batches": 0}
     
-    def insert_chunks_individual(self, documents: List[Document]):
+    def insert_chunks_individual(self, documents: Iterable[Document]):
         """
         Insert documents one by one (slower but more reliable) using pgvector
         """
-        total_docs = len(documents)
-        logger.info(f"Starting to insert {total_docs} documents individually")
+        logger.info("Starting to insert documents individually")
+        
+        successful_inserts, failed_inserts = self._run(self._ainsert_individual(documents))
         
+        logger.info(f"Insertion complete. Successful: {successful_inserts}, Failed: {failed_inserts}")
+    
+    async def _ainsert_individual(self, documents: Iterable[Document]) -> Tuple[int, int]:
+        """Insert documents one at a time, each embedded and copied on its own"""
         successful_inserts = 0
         failed_inserts = 0
         
         for i, doc in enumerate(tqdm(documents, desc="Inserting documents")):
             try:
-                self.vector_store.add_documents([doc])
+                await self._acopy_rows([doc], await self._aembed_documents([doc]))
                 successful_inserts += 1
             except Exception as e:
                 logger.error(f"Error inserting document {i}: {e}")
                 failed_inserts += 1
                 continue
         
-        logger.info(f"Insertion complete. Successful: {successful_inserts}, Failed: {failed_inserts}")
+        return successful_inserts, failed_inserts
     
     def process_csv_file(self, 
                         csv_file_path: str, 
-                        batch_size: int = 25,
+                        batch_size: int = 500,
                         use_batch_insert: bool = True,
                         resume: bool = True):
         """
@@ -256,38 +705,52 @@ class HadithPGVectorInserter:
             use_batch_insert: Whether to use batch insertion or individual insertion
             resume: Whether to resume from previous progress if available
         """
-        # Read CSV file
-        df = self.read_csv_file(csv_file_path)
-        
-        # Convert rows to documents
-        logger.info("Converting CSV rows to documents...")
-        documents = []
-        for _, row in df.iterrows():
-            try:
-                doc = self.create_document_from_row(row)
-                documents.append(doc)
-            except Exception as e:
-                logger.error(f"Error creating document from row: {e}")
-                continue
-        
-        logger.info(f"Created {len(documents)} documents from CSV")
+        # Drop the vector index up front; it is rebuilt once the load finishes
+        self._drop_vector_index()
+        if self.allow_unlogged:
+            self._set_table_logged(False)
         
         # Check if we should resume from previous progress
         resume_from = 0
         if resume and use_batch_insert:
             progress = self._load_progress()
-            resume_from = progress["current_batch"]
+            resume_from = progress["current_row"]
+            if resume_from > 0 and self.allow_unlogged and self._count_rows() == 0:
+                # A crash truncates an unlogged table, so the saved rows may no longer exist
+                logger.warning(f"Progress file says {resume_from} rows were inserted but the table is empty; starting over")
+                resume_from = 0
+            if resume_from > 0:
+                logger.info(f"Resuming from row {resume_from}")
         
-        # Insert documents into PostgreSQL pgvector
-        if use_batch_insert:
-            self.insert_chunks_batch(documents, batch_size, resume_from)
-        else:
-            self.insert_chunks_individual(documents)
+        # Stream documents from the CSV; only a few batches are held in memory at a time
+        documents = self.doc_stream(csv_file_path, resume_from)
+        
+        # Progress is written every PROGRESS_FLUSH_INTERVAL seconds, and once more if the run stops early
+        previous_sigterm_handler = signal.signal(signal.SIGTERM, self._handle_sigterm)
+        try:
+            # Insert documents into PostgreSQL pgvector
+            if use_batch_insert:
+                self.insert_chunks_batch(documents, batch_size, resume_from)
+            else:
+                self.insert_chunks_individual(documents)
+        except BaseException:
+            self._flush_progress()
+            raise
+        finally:
+            signal.signal(signal.SIGTERM, previous_sigterm_handler)
+        # Record the finished load, so a kill while the index builds doesn't re-insert rows
+        self._flush_progress()
+        self._progress = None
+        
+        # SET LOGGED rewrites the table and its indexes, so switch back before building HNSW
+        if self.allow_unlogged:
+            self._set_table_logged(True)
+        self._create_vector_index()
         
         # Clean up progress file on successful completion
-        if os.path.exists("insertion_progress.json"):
+        if os.path.exists(PROGRESS_FILE):
             try:
-                os.remove("insertion_progress.json")
+                os.remove(PROGRESS_FILE)
                 logger.info("Progress file cleaned up")
             except Exception as e:
                 logger.warning(f"Could not clean up progress file: {e}")
@@ -302,9 +765,8 @@ def main():
     config = {
         "postgres_url": os.getenv("POSTGRES_URL"),
         "google_api_key": os.getenv("GOOGLE_API_KEY"),
-        "collection_name": os.getenv("COLLECTION_NAME", "rag_ahadees"),
         "csv_file_path": os.getenv("CSV_FILE_PATH", "all_hadiths_clean.csv"),
-        "batch_size": int(os.getenv("BATCH_SIZE", "25")),
+        "batch_size": int(os.getenv("BATCH_SIZE", "500")),
         "use_batch_insert": os.getenv("USE_BATCH_INSERT", "true").lower() == "true",
         "max_retries": int(os.getenv("MAX_RETRIES", "3")),
         "resume": os.getenv("RESUME", "true").lower() == "true"
@@ -333,7 +795,6 @@ def main():
         inserter = HadithPGVectorInserter(
             postgres_url=config["postgres_url"],
             google_api_key=config["google_api_key"],
-            collection_name=config["collection_name"],
             max_retries=config["max_retries"]
         )
         
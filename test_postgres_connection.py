@@ -33,49 +33,50 @@ def test_postgres_connection():
     try:
         # Test PostgreSQL connection
         print("\n1️⃣ Testing PostgreSQL connection...")
-        from langchain_postgres import PGVector
+        from sqlalchemy import create_engine, text
         from langchain_google_genai import GoogleGenerativeAIEmbeddings
         
-        # Initialize embeddings
+        embedding_dim = int(os.getenv('EMBEDDING_DIM', '3072'))
+        engine = create_engine(postgres_url)
+        with engine.connect() as conn:
+            version = conn.execute(text(
+                "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+            )).scalar()
+        if version is None:
+            print("❌ pgvector extension is not installed (CREATE EXTENSION vector;)")
+            return False
+        
+        print(f"✅ PostgreSQL connection successful! pgvector {version}")
+        
+        # Test embedding a query
+        print("\n2️⃣ Testing query embedding...")
         os.environ["GOOGLE_API_KEY"] = google_api_key
         embeddings = GoogleGenerativeAIEmbeddings(
             model="models/gemini-embedding-001",
-            google_api_key=google_api_key
-        )
-        
-        # Test connection by creating a test collection
-        test_collection = "test-connection-123"
-        vector_store = PGVector(
-            connection=postgres_url,
-            embedding_function=embeddings,
-            collection_name=test_collection,
-            use_jsonb=True
-        )
-        
-        print("✅ PostgreSQL connection successful!")
-        
-        # Test document insertion
-        print("\n2️⃣ Testing document insertion...")
-        from langchain_core.documents import Document
-        
-        test_doc = Document(
-            page_content="This is a test hadith in English. هذا حديث تجريبي باللغة العربية.",
-            metadata={"source": "test", "hadith_number": 999}
+            google_api_key=google_api_key,
+            output_dimensionality=embedding_dim
         )
+        query_vector = embeddings.embed_query("test hadith")
+        print(f"✅ Embedding successful: {len(query_vector)} dimensions")
         
-        vector_store.add_documents([test_doc])
-        print("✅ Document insertion successful!")
-        
-        # Test search
+        # Test search against the table written by rag.py
         print("\n3️⃣ Testing vector search...")
-        search_results = vector_store.similarity_search("test hadith", k=1)
-        print(f"✅ Search successful: {len(search_results)} results")
-        print(f"Search result: {search_results[0].page_content}")
+        with engine.connect() as conn:
+            exists = conn.execute(text("SELECT to_regclass('hadith_embeddings')")).scalar()
+            if exists is None:
+                print("⚠️  Table hadith_embeddings does not exist yet; run rag.py to create it")
+                return True
+            
+            result = conn.execute(text(
+                "SELECT source, hadith_number, text, embedding <=> CAST(:query AS halfvec) AS distance "
+                "FROM hadith_embeddings ORDER BY distance LIMIT 1"
+            ), {"query": str(query_vector)}).first()
         
-        # Clean up test collection
-        print("\n4️⃣ Cleaning up test collection...")
-        # Note: PGVector doesn't have a direct delete method, but the test collection
-        # will be automatically cleaned up when the connection is closed
+        if result is None:
+            print("⚠️  Table hadith_embeddings is empty; run rag.py to insert hadiths")
+        else:
+            print(f"✅ Search successful: {result.source} {result.hadith_number} (distance {result.distance:.4f})")
+            print(f"Search result: {result.text[:200]}")
         
         return True
         